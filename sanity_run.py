@@ -20,7 +20,7 @@ except ImportError:
     pass
 
 from src.ingestion import ingest_directory
-from src.indexing import clear_collection, index_chunks
+from src.indexing import clear_collection, index_chunks, index_settings_outdated
 from src.memory import process_memory
 from src.rag_chain import answer_for_sanity
 
@@ -65,9 +65,11 @@ Avoid secrets or sensitive information.
 """)
 
     # 1. Ingest + index
+    # Unchanged chunks are skipped; replace=True drops records of any file not in sample_docs/
+    if index_settings_outdated(base / "chroma_db"):
+        clear_collection(base / "chroma_db")
     chunks = ingest_directory(sample_docs)
-    clear_collection(base / "chroma_db")
-    index_chunks(chunks, persist_directory=base / "chroma_db")
+    index_chunks(chunks, persist_directory=base / "chroma_db", replace=True)
 
     # 2. Run RAG Q&A
     qa = [
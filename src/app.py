@@ -1,7 +1,9 @@
 """Streamlit UI for the Agentic RAG Chatbot."""
 
+import asyncio
 import os
 import sys
+import tempfile
 from pathlib import Path
 
 # Ensure project root is on path so "src" package can be found
@@ -18,14 +20,36 @@ if str(_project_root) not in sys.path:
 
 import streamlit as st
 
-from src.ingestion import ingest_document, ingest_directory
-from src.indexing import clear_collection, index_chunks
-from src.memory import load_memory_for_context, process_memory
-from src.rag_chain import answer_with_citations
+from src.ingestion import ingest_directory
+from src.indexing import (
+    clear_collection,
+    get_embedding_model,
+    index_chunks,
+    index_settings_outdated,
+)
+from src.memory import load_memory_for_context, process_memory_async
+from src.rag_chain import answer_with_citations_async
 
 # Page config
 st.set_page_config(page_title="Agentic RAG Chatbot", page_icon="🤖", layout="centered")
 
+
+@st.cache_resource(show_spinner="Loading embedding model...")
+def load_embedding_model():
+    """Load the embedding model once and reuse it across Streamlit reruns."""
+    return get_embedding_model()
+
+
+async def answer_and_remember(question: str) -> tuple[tuple[str, list[dict]], list[dict]]:
+    """
+    Run the RAG answer and memory extraction concurrently. Memory is extracted
+    from the user's message alone so it does not wait on the answer.
+    """
+    return await asyncio.gather(
+        answer_with_citations_async(question),
+        process_memory_async(question, ""),
+    )
+
 st.title("🤖 Agentic RAG Chatbot")
 st.caption("Upload documents, ask questions with citations, and persistent memory")
 
@@ -37,10 +61,9 @@ with st.sidebar:
     sample_docs = Path("sample_docs")
     if sample_docs.exists():
         if st.button("📂 Index sample_docs/", use_container_width=True):
-            chunks = ingest_directory(sample_docs)
-            if chunks:
-                clear_collection()
-                n = index_chunks(chunks)
+            # sample_docs/ is the whole corpus: drop chunks of files no longer in it
+            n = index_chunks(ingest_directory(sample_docs), replace=True)
+            if n:
                 st.success(f"Indexed {n} chunks from sample_docs/")
             else:
                 st.warning("No supported files in sample_docs/")
@@ -52,22 +75,27 @@ with st.sidebar:
     )
     if uploaded_files:
         if st.button("Index uploaded files", use_container_width=True):
-            all_chunks = []
-            for f in uploaded_files:
-                path = Path(f.name)
-                path.write_bytes(f.getvalue())
-                try:
-                    chunks = ingest_document(path)
-                    all_chunks.extend(chunks)
-                finally:
-                    path.unlink(missing_ok=True)
-            if all_chunks:
-                clear_collection()
-                n = index_chunks(all_chunks)
+            # Chunks are streamed into the index, so files must exist until indexing ends
+            with tempfile.TemporaryDirectory() as upload_dir:
+                names = [Path(f.name).name for f in uploaded_files]
+                for f, name in zip(uploaded_files, names):
+                    (Path(upload_dir) / name).write_bytes(f.getvalue())
+                # Re-uploaded files replace their earlier chunks, even if now empty
+                n = index_chunks(ingest_directory(Path(upload_dir)), sources=names)
+            if n:
                 st.success(f"Indexed {n} chunks")
             else:
                 st.warning("Could not parse uploaded files.")
 
+    if st.button("🗑️ Clear index", use_container_width=True):
+        clear_collection()
+        st.success("Index cleared")
+    if index_settings_outdated():
+        st.warning(
+            "The index was built with older search settings. "
+            "Clear it and re-index your documents to apply the current ones."
+        )
+
     st.divider()
     st.markdown("**Memory files**")
     st.markdown("- USER_MEMORY.md")
@@ -96,7 +124,7 @@ if prompt := st.chat_input("Ask a question about your documents..."):
 
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
-            answer, citations = answer_with_citations(prompt)
+            (answer, citations), memory_writes = asyncio.run(answer_and_remember(prompt))
             st.markdown(answer)
             if citations:
                 with st.expander("📎 Citations"):
@@ -104,8 +132,7 @@ if prompt := st.chat_input("Ask a question about your documents..."):
                         st.markdown(f"- **{c['source']}** ({c['locator']})")
                         st.caption(c["snippet"][:150] + "..." if len(c["snippet"]) > 150 else c["snippet"])
 
-            # Memory: extract and write selective facts
-            memory_writes = process_memory(prompt, answer)
+            # Memory: selective facts extracted alongside the answer
             if memory_writes:
                 st.caption(f"Remembered: {len(memory_writes)} fact(s)")
 
@@ -114,3 +141,7 @@ if prompt := st.chat_input("Ask a question about your documents..."):
         "content": answer,
         "citations": citations,
     })
+
+# Warm the embedding model after the page (including the chat input) has rendered,
+# so the cold start overlaps with the user typing the first question
+load_embedding_model()
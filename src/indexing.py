@@ -1,8 +1,18 @@
 """Indexing: embed chunks and store in ChromaDB."""
 
+import logging
+import os
+import queue
+import threading
+import time
+from itertools import chain, islice
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, TypeVar
 
 import chromadb
+import chromadb.errors
+import numpy as np
+import torch
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 
@@ -10,11 +20,149 @@ from sentence_transformers import SentenceTransformer
 # Default persistence path
 DEFAULT_CHROMA_PATH = Path("chroma_db")
 DEFAULT_COLLECTION_NAME = "rag_chunks"
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Max records per collection.add call (Chroma performs best around 50-250)
+_CHROMA_BATCH = int(os.environ.get("CHROMA_BATCH", "128"))
+# Chunks buffered at a time for length sorting; bounds indexing memory
+_SORT_WINDOW = 8 * _CHROMA_BATCH
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Process-wide embedding model, loaded lazily on first use
+_MODEL: SentenceTransformer | None = None
+_MODEL_LOCK = threading.Lock()
+
+# Process-wide Chroma clients (keyed by resolved path) and collection handles
+_CLIENTS: dict[str, chromadb.ClientAPI] = {}
+_COLLECTIONS: dict[tuple[str, str], chromadb.Collection] = {}
+
+# Raised when a cached handle's collection was deleted (e.g. by another process);
+# the class name differs across Chroma versions
+_MISSING_COLLECTION_ERRORS = tuple(
+    getattr(chromadb.errors, name)
+    for name in ("NotFoundError", "InvalidCollectionException")
+    if hasattr(chromadb.errors, name)
+)
 
 
 def get_embedding_model() -> SentenceTransformer:
-    """Load the sentence-transformers embedding model (cached after first load)."""
-    return SentenceTransformer("all-MiniLM-L6-v2")
+    """
+    Load the sentence-transformers embedding model (cached after first load).
+    - Device: EMBED_DEVICE if set, else CUDA when available, else CPU
+    - Backend: EMBED_BACKEND = "torch" (default), "onnx" or "openvino"
+    - On CUDA the torch backend runs in fp16 (set EMBED_FP16=0 to keep fp32)
+    - EMBED_INT8=1 with the onnx backend loads the int8-quantized ONNX export
+    """
+    global _MODEL
+    if _MODEL is not None:
+        return _MODEL
+    with _MODEL_LOCK:
+        if _MODEL is None:
+            device = os.environ.get("EMBED_DEVICE") or ("cuda" if torch.cuda.is_available() else "cpu")
+            backend = os.environ.get("EMBED_BACKEND", "torch").lower()
+            model_kwargs = {}
+            if backend == "onnx" and os.environ.get("EMBED_INT8", "").lower() in ("1", "true", "yes"):
+                model_kwargs["file_name"] = os.environ.get(
+                    "EMBED_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx"
+                )
+            model = SentenceTransformer(
+                EMBEDDING_MODEL_NAME,
+                device=device,
+                backend=backend,
+                model_kwargs=model_kwargs or None,
+            )
+            if backend == "torch" and device.startswith("cuda") and os.environ.get("EMBED_FP16", "1") != "0":
+                model.half()
+            # Warm-up: first encode triggers kernel/graph initialization
+            model.encode(["warmup"], show_progress_bar=False)
+            _MODEL = model
+    return _MODEL
+
+
+def _hnsw_metadata() -> dict:
+    """
+    HNSW settings for new collections. Embeddings are L2-normalized, so inner
+    product ranks exactly like cosine without the norm division.
+    Overrides: HNSW_M, HNSW_CONSTRUCTION_EF, HNSW_EF (search ef).
+    """
+    return {
+        "hnsw:space": "ip",
+        "hnsw:M": int(os.environ.get("HNSW_M", "32")),
+        "hnsw:construction_ef": int(os.environ.get("HNSW_CONSTRUCTION_EF", "200")),
+        "hnsw:search_ef": int(os.environ.get("HNSW_EF", "64")),
+    }
+
+
+def _get_client(persist_directory: str | Path) -> chromadb.ClientAPI:
+    """Return the process-wide PersistentClient for a path, opening it on first use."""
+    key = str(Path(persist_directory).resolve())
+    client = _CLIENTS.get(key)
+    if client is None:
+        client = chromadb.PersistentClient(
+            path=str(persist_directory),
+            settings=Settings(anonymized_telemetry=False),
+        )
+        _CLIENTS[key] = client
+    return client
+
+
+def _get_collection(
+    persist_directory: str | Path,
+    collection_name: str,
+    create: bool = True,
+) -> chromadb.Collection:
+    """
+    Return a cached collection handle. With create=False a missing collection
+    raises (from Chroma) instead of being created; misses are not cached.
+    """
+    key = (str(Path(persist_directory).resolve()), collection_name)
+    collection = _COLLECTIONS.get(key)
+    if collection is None:
+        client = _get_client(persist_directory)
+        if create:
+            collection = client.get_or_create_collection(
+                name=collection_name,
+                metadata=_hnsw_metadata(),
+            )
+        else:
+            collection = client.get_collection(collection_name)
+        outdated = _outdated_hnsw_settings(collection)
+        if outdated:
+            logger.warning(
+                "Collection %r was created with different HNSW settings %s; "
+                "clear and re-index it to apply the current ones.",
+                collection_name, outdated,
+            )
+        _COLLECTIONS[key] = collection
+    return collection
+
+
+def _outdated_hnsw_settings(collection: chromadb.Collection) -> dict:
+    """Return {key: (stored, wanted)} for HNSW settings that differ from _hnsw_metadata()."""
+    stored = collection.metadata or {}
+    return {
+        k: (stored.get(k), v)
+        for k, v in _hnsw_metadata().items()
+        if stored.get(k) != v
+    }
+
+
+def index_settings_outdated(
+    persist_directory: str | Path = DEFAULT_CHROMA_PATH,
+    collection_name: str = DEFAULT_COLLECTION_NAME,
+) -> bool:
+    """
+    True if the stored collection was created with other HNSW settings (e.g. the
+    older cosine space). Chroma fixes these at creation, so it must be rebuilt.
+    """
+    try:
+        collection = _get_collection(persist_directory, collection_name, create=False)
+    except Exception:
+        return False
+    return bool(_outdated_hnsw_settings(collection))
 
 
 def get_or_create_collection(
@@ -22,44 +170,190 @@ def get_or_create_collection(
     collection_name: str = DEFAULT_COLLECTION_NAME,
 ) -> chromadb.Collection:
     """Get or create a ChromaDB collection with persistence."""
-    client = chromadb.PersistentClient(
-        path=str(persist_directory),
-        settings=Settings(anonymized_telemetry=False),
-    )
-    return client.get_or_create_collection(
-        name=collection_name,
-        metadata={"hnsw:space": "cosine"},
-    )
+    return _get_collection(persist_directory, collection_name)
+
+
+def _is_missing_collection(error: Exception) -> bool:
+    """True if Chroma reports that the collection behind a handle no longer exists."""
+    return isinstance(error, _MISSING_COLLECTION_ERRORS) or "does not exist" in str(error)
+
+
+def _forget_collection(persist_directory: str | Path, collection_name: str) -> None:
+    """Drop a cached collection handle so the next lookup reopens it."""
+    _COLLECTIONS.pop((str(Path(persist_directory).resolve()), collection_name), None)
+
+
+def _with_collection(
+    persist_directory: str | Path,
+    collection_name: str,
+    fn: Callable[[chromadb.Collection], T],
+    create: bool = True,
+) -> T:
+    """
+    Run fn(collection) on the cached handle. If the collection was deleted and
+    recreated elsewhere (e.g. another process cleared it), the stale handle is
+    dropped and fn is retried once on a freshly resolved one.
+    """
+    collection = _get_collection(persist_directory, collection_name, create)
+    try:
+        return fn(collection)
+    except Exception as e:
+        if not _is_missing_collection(e):
+            raise
+        logger.warning("Collection %r changed on disk; reopening it.", collection_name)
+        _forget_collection(persist_directory, collection_name)
+        return fn(_get_collection(persist_directory, collection_name, create))
+
+
+def _encode(model: SentenceTransformer, texts: list[str]) -> np.ndarray:
+    """Encode texts into L2-normalized float32 embeddings (passed to Chroma as-is)."""
+    return model.encode(
+        texts,
+        batch_size=int(os.environ.get("EMBED_BATCH", "128")),
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    ).astype(np.float32, copy=False)
+
+
+def _chroma_writer(
+    persist_directory: str | Path,
+    collection_name: str,
+    q: queue.Queue,
+    errors: list,
+) -> None:
+    """Consume encoded batches from the queue and add them until a None sentinel."""
+    while True:
+        batch = q.get()
+        if batch is None:
+            return
+        if errors:
+            continue  # keep draining so the producer never blocks
+        try:
+            _with_collection(persist_directory, collection_name, lambda c: c.add(**batch))
+        except Exception as e:
+            errors.append(e)
+
+
+def _length_sorted_batches(chunks: Iterator[dict]) -> Iterator[list[dict]]:
+    """
+    Yield batches of up to CHROMA_BATCH chunks. Chunks are read in windows of
+    _SORT_WINDOW and sorted by text length so each batch pads to similar lengths.
+    """
+    while window := list(islice(chunks, _SORT_WINDOW)):
+        window.sort(key=lambda c: len(c["text"]))
+        for i in range(0, len(window), _CHROMA_BATCH):
+            yield window[i:i + _CHROMA_BATCH]
+
+
+def _chunk_id(metadata: dict) -> str:
+    """Stable record id: source, chunk index and (when present) content hash."""
+    chunk_id = f"{metadata['source']}_{metadata['chunk_id']}"
+    content_sha = metadata.get("content_sha")
+    return f"{chunk_id}_{content_sha}" if content_sha else chunk_id
+
+
+def _prune_stale(
+    collection: chromadb.Collection,
+    kept_ids: set[str],
+    sources: set[str] | None,
+) -> int:
+    """
+    Delete stored records not produced by this run: every such record when
+    sources is None, else only those of the given sources. Returns count.
+    """
+    if sources is None:
+        stored = collection.get(include=[])["ids"]
+    elif sources:
+        stored = collection.get(where={"source": {"$in": sorted(sources)}}, include=[])["ids"]
+    else:
+        return 0
+    stale = [i for i in stored if i not in kept_ids]
+    for i in range(0, len(stale), _CHROMA_BATCH):
+        collection.delete(ids=stale[i:i + _CHROMA_BATCH])
+    return len(stale)
 
 
 def index_chunks(
-    chunks: list[dict],
+    chunks: Iterable[dict],
     persist_directory: str | Path = DEFAULT_CHROMA_PATH,
     collection_name: str = DEFAULT_COLLECTION_NAME,
+    sources: Iterable[str] = (),
+    replace: bool = False,
 ) -> int:
     """
     Embed chunks and add to ChromaDB. Returns number of chunks indexed.
+    Chunks are consumed lazily in bounded batches, so a generator such as
+    ingest_directory() is never materialized in full. Batches are encoded on the
+    calling thread while a writer thread adds the previous batches to Chroma.
+    Chunks whose id (which includes the content hash) is already stored are not
+    re-embedded. Older chunks are removed for:
+    - every source seen in chunks, plus the names in sources (pass the files
+      being re-indexed so ones that now yield no chunks are cleared too)
+    - with replace=True, every source: chunks are the whole corpus, so records
+      of deleted or emptied files are dropped (directory re-index)
     """
-    if not chunks:
+    sources = set(sources)
+    batches = _length_sorted_batches(iter(chunks))
+    first = next(batches, None)
+    if first is None and not (replace or sources):
         return 0
 
-    model = get_embedding_model()
-    collection = get_or_create_collection(persist_directory, collection_name)
+    model = None
 
-    texts = [c["text"] for c in chunks]
-    metadatas = [c["metadata"] for c in chunks]
-    ids = [f"{m['source']}_{m['chunk_id']}" for m in metadatas]
-
-    embeddings = model.encode(texts, show_progress_bar=False)
-
-    collection.add(
-        ids=ids,
-        embeddings=embeddings.tolist(),
-        documents=texts,
-        metadatas=metadatas,
+    start = time.perf_counter()
+    total = 0
+    embedded = 0
+    kept_ids: set[str] = set()
+    q: queue.Queue = queue.Queue(maxsize=4)
+    errors: list[Exception] = []
+    writer = threading.Thread(
+        target=_chroma_writer,
+        args=(persist_directory, collection_name, q, errors),
+        daemon=True,
+    )
+    writer.start()
+    try:
+        for batch in chain([first] if first is not None else [], batches):
+            total += len(batch)
+            ids = [_chunk_id(c["metadata"]) for c in batch]
+            kept_ids.update(ids)
+            sources.update(c["metadata"]["source"] for c in batch)
+            existing = set(_with_collection(
+                persist_directory, collection_name, lambda c: c.get(ids=ids, include=[])["ids"]
+            ))
+            new = [(i, c) for i, c in zip(ids, batch) if i not in existing]
+            if not new:
+                continue
+            if model is None:
+                model = get_embedding_model()
+            texts = [c["text"] for _, c in new]
+            q.put({
+                "ids": [i for i, _ in new],
+                "embeddings": _encode(model, texts),
+                "documents": texts,
+                "metadatas": [c["metadata"] for _, c in new],
+            })
+            embedded += len(new)
+            if errors:
+                break
+    finally:
+        q.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+    pruned = _with_collection(
+        persist_directory,
+        collection_name,
+        lambda c: _prune_stale(c, kept_ids, None if replace else sources),
     )
 
-    return len(chunks)
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Indexed %d chunks (%d embedded, %d unchanged, %d stale removed) in %.2fs",
+        total, embedded, total - embedded, pruned, elapsed,
+    )
+    return total
 
 
 def clear_collection(
@@ -67,11 +361,14 @@ def clear_collection(
     collection_name: str = DEFAULT_COLLECTION_NAME,
 ) -> None:
     """Delete the collection (for re-indexing)."""
-    client = chromadb.PersistentClient(
-        path=str(persist_directory),
-        settings=Settings(anonymized_telemetry=False),
-    )
+    _forget_collection(persist_directory, collection_name)
+    client = _get_client(persist_directory)
     try:
         client.delete_collection(collection_name)
     except Exception:
         pass
+
+
+# Optional warm start: load (and warm up) the model in the background on import
+if os.environ.get("EMBED_WARMUP", "").lower() in ("1", "true", "yes"):
+    threading.Thread(target=get_embedding_model, name="embedding-warmup", daemon=True).start()
@@ -1,99 +1,156 @@
 """Document ingestion: parse and chunk documents for RAG."""
 
+import hashlib
+import operator
 import re
+from bisect import bisect_left
+from itertools import accumulate, count
 from pathlib import Path
-from typing import Iterator
+from typing import Iterable, Iterator
 
 from pypdf import PdfReader
 
+# Blank line(s) between paragraphs/sections
+_SECTION_RE = re.compile(r"\n\s*\n")
+# First line that looks like a heading: starts with "#" or ends with ":"
+_HEADING_RE = re.compile(r"#[^\n]*|[^\n]*:(?=\n|\Z)")
 
-def parse_file(file_path: Path) -> str:
-    """Parse a file and return its text content."""
+
+def parse_pages(file_path: Path) -> Iterator[str]:
+    """
+    Parse a file lazily, yielding its text one page at a time (PDF) or as a
+    single item (txt/md), so large PDFs are never held as one string.
+    """
     suffix = file_path.suffix.lower()
     if suffix == ".txt" or suffix == ".md":
-        return file_path.read_text(encoding="utf-8", errors="replace")
+        yield file_path.read_text(encoding="utf-8", errors="replace")
+        return
     if suffix == ".pdf":
-        reader = PdfReader(str(file_path))
-        return "\n\n".join(
-            page.extract_text() or "" for page in reader.pages
-        )
+        # Prefer PyMuPDF (native parser) when installed; fall back to pypdf
+        try:
+            import fitz
+        except ImportError:
+            reader = PdfReader(str(file_path))
+            for page in reader.pages:
+                yield page.extract_text() or ""
+            return
+        with fitz.open(str(file_path)) as doc:
+            for page in doc:
+                yield page.get_text("text")
+        return
     raise ValueError(f"Unsupported file type: {suffix}")
 
 
+def parse_file(file_path: Path) -> str:
+    """Parse a file and return its text content."""
+    return "\n\n".join(parse_pages(file_path))
+
+
+def _iter_sections(text: str) -> Iterator[str]:
+    """Yield the blocks between blank lines lazily (same pieces as re.split)."""
+    pos = 0
+    for sep in _SECTION_RE.finditer(text):
+        yield text[pos:sep.start()]
+        pos = sep.end()
+    yield text[pos:]
+
+
 def chunk_text(
-    text: str,
+    text: str | Iterable[str],
     chunk_size: int = 500,
     overlap: int = 50,
 ) -> Iterator[tuple[str, int, str | None]]:
-    """Split text into overlapping chunks. Yields (chunk, chunk_index, section)."""
-    # Try to split at paragraph/section boundaries first
-    sections = re.split(r"\n\s*\n", text.strip())
-    current_chunk = []
-    current_len = 0
-    chunk_idx = 0
+    """
+    Split text into overlapping chunks. Yields (chunk, chunk_index, section).
+    text may be one string or an iterable of pages; pages are treated as if
+    joined by blank lines. Chunks are yielded as soon as each section is read,
+    and only the words not yet chunked are kept (chunks flow across sections
+    and page boundaries).
+    """
+    pages = [text] if isinstance(text, str) else text
+    words: list[str] = []
+    word_sections: list[str | None] = []
+    # cum[k] = running length through words[k], counting one space per word;
+    # origin = running length before words[0] (words before it were dropped)
+    cum: list[int] = []
+    origin = 0
     section_name = None
+    start = 0  # first word of the current chunk
+    last_end = -1  # last word of the previously emitted chunk
+    chunk_idx = 0
 
-    for i, section in enumerate(sections):
-        section = section.strip()
-        if not section:
-            continue
-        # Extract potential section header (first line if it looks like a heading)
-        lines = section.split("\n")
-        if lines and (lines[0].startswith("#") or lines[0].endswith(":")):
-            section_name = lines[0][:80].strip()
-
-        words = section.split()
-        for word in words:
-            current_chunk.append(word)
-            current_len += len(word) + 1
-            if current_len >= chunk_size:
-                chunk_text = " ".join(current_chunk)
-                yield chunk_text, chunk_idx, section_name
+    for page in pages:
+        # Try to split at paragraph/section boundaries first
+        for section in _iter_sections(page.strip()):
+            section = section.strip()
+            if not section:
+                continue
+            # Extract potential section header (first line if it looks like a heading)
+            heading = _HEADING_RE.match(section)
+            if heading:
+                section_name = heading.group()[:80].strip()
+            section_words = section.split()
+            prev = cum[-1] if cum else origin
+            cum.extend(map(operator.add, accumulate(map(len, section_words)), count(prev + 1)))
+            words.extend(section_words)
+            word_sections.extend([section_name] * len(section_words))
+
+            while True:
+                # First word at which the running chunk length reaches chunk_size
+                base = cum[start - 1] if start else origin
+                end_idx = bisect_left(cum, base + chunk_size, last_end + 1)
+                if end_idx >= len(words):
+                    break  # chunk not complete yet; wait for more text
+                yield " ".join(words[start:end_idx + 1]), chunk_idx, word_sections[end_idx]
                 chunk_idx += 1
+                last_end = end_idx
                 # Overlap: keep last overlap words
-                overlap_words = current_chunk[-overlap:] if len(current_chunk) > overlap else current_chunk
-                current_chunk = overlap_words
-                current_len = sum(len(w) + 1 for w in overlap_words)
+                if overlap <= 0:
+                    start = end_idx + 1
+                elif end_idx + 1 - start > overlap:
+                    start = end_idx + 1 - overlap
 
-    if current_chunk:
-        yield " ".join(current_chunk), chunk_idx, section_name
+            # Drop words that can no longer appear in a chunk
+            if start:
+                origin = cum[start - 1]
+                del words[:start]
+                del word_sections[:start]
+                del cum[:start]
+                last_end -= start
+                start = 0
+
+    if words:
+        yield " ".join(words), chunk_idx, word_sections[-1]
 
 
 def ingest_document(
     file_path: Path,
     chunk_size: int = 500,
     overlap: int = 50,
-) -> list[dict]:
-    """Ingest a document: parse and chunk. Returns list of chunk dicts."""
-    text = parse_file(file_path)
+) -> Iterator[dict]:
+    """Ingest a document: parse and chunk. Yields chunk dicts."""
     source_name = file_path.name
-    chunks = []
 
-    for text_chunk, chunk_idx, section in chunk_text(text, chunk_size, overlap):
+    for text_chunk, chunk_idx, section in chunk_text(parse_pages(file_path), chunk_size, overlap):
         locator = f"chunk {chunk_idx}"
         if section:
             locator = f"{section} ({locator})"
 
-        chunks.append({
+        yield {
             "text": text_chunk,
             "metadata": {
                 "source": source_name,
                 "chunk_id": chunk_idx,
                 "locator": locator,
+                "content_sha": hashlib.sha1(text_chunk.encode("utf-8")).hexdigest()[:16],
             },
-        })
-
-    return chunks
+        }
 
 
-def ingest_directory(dir_path: Path, chunk_size: int = 500, overlap: int = 50) -> list[dict]:
-    """Ingest all supported files from a directory."""
-    all_chunks = []
+def ingest_directory(dir_path: Path, chunk_size: int = 500, overlap: int = 50) -> Iterator[dict]:
+    """Ingest all supported files from a directory. Yields chunk dicts file by file."""
     supported = {".txt", ".md", ".pdf"}
 
     for path in sorted(dir_path.iterdir()):
         if path.suffix.lower() in supported:
-            chunks = ingest_document(path, chunk_size, overlap)
-            all_chunks.extend(chunks)
-
-    return all_chunks
+            yield from ingest_document(path, chunk_size, overlap)
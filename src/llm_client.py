@@ -2,7 +2,7 @@
 
 import os
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 OLLAMA_BASE_URL = "http://localhost:11434/v1"
 DEFAULT_OLLAMA_MODEL = "llama3.2"
@@ -13,21 +13,33 @@ def _use_ollama() -> bool:
     return os.environ.get("USE_OLLAMA", "").lower() in ("1", "true", "yes")
 
 
+def _client_kwargs(api_key: str | None = None) -> dict | None:
+    """Connection settings shared by the sync and async clients (None if no LLM)."""
+    if _use_ollama():
+        return {
+            "base_url": os.environ.get("OLLAMA_BASE_URL", OLLAMA_BASE_URL),
+            "api_key": os.environ.get("OLLAMA_API_KEY", "ollama"),
+        }
+    key = api_key or os.environ.get("OPENAI_API_KEY")
+    if not key:
+        return None
+    return {"api_key": key}
+
+
 def get_client(api_key: str | None = None) -> OpenAI | None:
     """
     Return an OpenAI-compatible client.
     - If USE_OLLAMA=1: Ollama at localhost:11434 (no API key needed)
     - Else: OpenAI (requires api_key or OPENAI_API_KEY)
     """
-    if _use_ollama():
-        return OpenAI(
-            base_url=os.environ.get("OLLAMA_BASE_URL", OLLAMA_BASE_URL),
-            api_key=os.environ.get("OLLAMA_API_KEY", "ollama"),
-        )
-    key = api_key or os.environ.get("OPENAI_API_KEY")
-    if not key:
-        return None
-    return OpenAI(api_key=key)
+    kwargs = _client_kwargs(api_key)
+    return OpenAI(**kwargs) if kwargs is not None else None
+
+
+def get_async_client(api_key: str | None = None) -> AsyncOpenAI | None:
+    """Async counterpart of get_client(), with the same Ollama/OpenAI selection."""
+    kwargs = _client_kwargs(api_key)
+    return AsyncOpenAI(**kwargs) if kwargs is not None else None
 
 
 def get_model() -> str:
@@ -4,12 +4,15 @@ import json
 import os
 from pathlib import Path
 
-from src.llm_client import get_client, get_model
+from src.llm_client import get_async_client, get_client, get_model
 
 
 USER_MEMORY_PATH = Path("USER_MEMORY.md")
 COMPANY_MEMORY_PATH = Path("COMPANY_MEMORY.md")
 
+# Casefolded facts per memory file, keyed by path and tagged with (mtime_ns, size)
+_MEM_CACHE: dict[Path, tuple[tuple[int, int], set[str]]] = {}
+
 MEMORY_PROMPT = """Analyze this conversation turn. Extract ONLY high-signal, reusable facts worth remembering.
 Rules:
 - USER facts: personal preferences, role, workflow preferences (e.g., "User prefers weekly summaries on Mondays", "User is a Project Finance Analyst")
@@ -25,6 +28,22 @@ If nothing worth storing, return: []
 Example: [{{"target": "USER", "summary": "User prefers weekly summaries on Mondays.", "confidence": 0.9}}]"""
 
 
+def _parse_memory_candidates(content: str) -> list[dict]:
+    """Parse the LLM's JSON reply, keeping only items with confidence >= 0.8."""
+    # Parse JSON (handle markdown code blocks)
+    content = content.strip()
+    if content.startswith("```"):
+        lines = content.split("\n")
+        content = "\n".join(lines[1:-1]) if len(lines) > 2 else "[]"
+
+    try:
+        items = json.loads(content)
+    except json.JSONDecodeError:
+        return []
+
+    return [i for i in items if isinstance(i, dict) and i.get("confidence", 0) >= 0.8]
+
+
 def extract_memory_candidates(
     user_message: str,
     assistant_message: str,
@@ -52,18 +71,63 @@ def extract_memory_candidates(
     except Exception:
         return []
 
-    # Parse JSON (handle markdown code blocks)
-    content = content.strip()
-    if content.startswith("```"):
-        lines = content.split("\n")
-        content = "\n".join(lines[1:-1]) if len(lines) > 2 else "[]"
+    return _parse_memory_candidates(content)
 
-    try:
-        items = json.loads(content)
-    except json.JSONDecodeError:
+
+async def extract_memory_candidates_async(
+    user_message: str,
+    assistant_message: str,
+    api_key: str | None = None,
+) -> list[dict]:
+    """Async variant of extract_memory_candidates() using AsyncOpenAI."""
+    client = get_async_client(api_key=api_key)
+    if not client:
         return []
 
-    return [i for i in items if isinstance(i, dict) and i.get("confidence", 0) >= 0.8]
+    turn = f"User: {user_message}\nAssistant: {assistant_message}"
+    prompt = MEMORY_PROMPT.format(turn=turn)
+
+    async with client:
+        try:
+            response = await client.chat.completions.create(
+                model=get_model(),
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0,
+            )
+            content = response.choices[0].message.content or "[]"
+        except Exception:
+            return []
+
+    return _parse_memory_candidates(content)
+
+
+def _file_signature(path: Path) -> tuple[int, int] | None:
+    """Return (mtime_ns, size) for a file, or None if it does not exist."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _load_lines(path: Path) -> set[str]:
+    """
+    Return the casefolded bullet facts in a memory file. The set is cached and
+    only re-read when the file's mtime or size changes.
+    """
+    signature = _file_signature(path)
+    if signature is None:
+        _MEM_CACHE.pop(path, None)
+        return set()
+    cached = _MEM_CACHE.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    facts = set()
+    for line in path.read_text().splitlines():
+        if line.strip().startswith("-"):
+            facts.add(line.strip()[1:].strip().casefold())
+    _MEM_CACHE[path] = (signature, facts)
+    return facts
 
 
 def append_to_memory(target: str, summary: str, base_path: Path) -> None:
@@ -75,35 +139,26 @@ def append_to_memory(target: str, summary: str, base_path: Path) -> None:
     else:
         return
 
+    cached = _MEM_CACHE.get(path)
+    cache_fresh = cached is not None and cached[0] == _file_signature(path)
+
     line = f"- {summary}\n"
     with open(path, "a", encoding="utf-8") as f:
         f.write(line)
 
+    # Keep the cached set current without re-reading the file
+    if cache_fresh:
+        cached[1].add(summary.strip().casefold())
+        _MEM_CACHE[path] = (_file_signature(path), cached[1])
+    else:
+        _MEM_CACHE.pop(path, None)
 
-def process_memory(
-    user_message: str,
-    assistant_message: str,
-    base_path: Path | None = None,
-    api_key: str | None = None,
-) -> list[dict]:
-    """
-    Extract memory candidates, append to files, return list of {target, summary}
-    for demo.memory_writes.
-    """
-    base_path = base_path or Path(".")
-    candidates = extract_memory_candidates(user_message, assistant_message, api_key)
 
-    # Avoid duplicates: read existing content and skip if summary already present
-    existing_user = set()
-    existing_company = set()
-    if USER_MEMORY_PATH.exists():
-        for line in USER_MEMORY_PATH.read_text().splitlines():
-            if line.strip().startswith("-"):
-                existing_user.add(line.strip()[1:].strip().lower())
-    if COMPANY_MEMORY_PATH.exists():
-        for line in COMPANY_MEMORY_PATH.read_text().splitlines():
-            if line.strip().startswith("-"):
-                existing_company.add(line.strip()[1:].strip().lower())
+def _write_memory_candidates(candidates: list[dict], base_path: Path) -> list[dict]:
+    """Append new (non-duplicate) candidates to the memory files; return {target, summary} list."""
+    # Avoid duplicates: skip summaries already present (cached per file)
+    existing_user = _load_lines(USER_MEMORY_PATH)
+    existing_company = _load_lines(COMPANY_MEMORY_PATH)
 
     written = []
     for c in candidates:
@@ -112,18 +167,42 @@ def process_memory(
         if not summary or target not in ("USER", "COMPANY"):
             continue
         existing = existing_user if target == "USER" else existing_company
-        if summary.lower() in existing:
+        if summary.casefold() in existing:
             continue
         append_to_memory(target, summary, base_path)
         written.append({"target": target, "summary": summary})
-        if target == "USER":
-            existing_user.add(summary.lower())
-        else:
-            existing_company.add(summary.lower())
+        existing.add(summary.casefold())
 
     return written
 
 
+def process_memory(
+    user_message: str,
+    assistant_message: str,
+    base_path: Path | None = None,
+    api_key: str | None = None,
+) -> list[dict]:
+    """
+    Extract memory candidates, append to files, return list of {target, summary}
+    for demo.memory_writes.
+    """
+    base_path = base_path or Path(".")
+    candidates = extract_memory_candidates(user_message, assistant_message, api_key)
+    return _write_memory_candidates(candidates, base_path)
+
+
+async def process_memory_async(
+    user_message: str,
+    assistant_message: str,
+    base_path: Path | None = None,
+    api_key: str | None = None,
+) -> list[dict]:
+    """Async variant of process_memory(); the LLM call can overlap other requests."""
+    base_path = base_path or Path(".")
+    candidates = await extract_memory_candidates_async(user_message, assistant_message, api_key)
+    return _write_memory_candidates(candidates, base_path)
+
+
 def load_memory_for_context(target: str) -> str:
     """Load USER or COMPANY memory as context string for the RAG prompt."""
     path = USER_MEMORY_PATH if target == "USER" else COMPANY_MEMORY_PATH
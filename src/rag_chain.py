@@ -1,10 +1,11 @@
 """RAG chain: retrieve + LLM with citations."""
 
+import asyncio
 import json
 import os
 
-from src.llm_client import get_client, get_model
-from src.retrieval import retrieve
+from src.llm_client import get_async_client, get_client, get_model
+from src.retrieval import make_snippet, retrieve
 
 
 CITATION_PROMPT = """You are a helpful assistant that answers questions based ONLY on the provided context.
@@ -22,14 +23,47 @@ Question: {question}
 Answer (with inline citations):"""
 
 
-def _format_context(chunks: list[dict]) -> str:
-    """Format retrieved chunks for the prompt."""
+def _build_context(chunks: list[dict]) -> tuple[str, list[dict]]:
+    """
+    Single pass over retrieved chunks: returns (prompt context, deduplicated
+    citations as {source, locator, snippet}).
+    """
     parts = []
+    citations = []
+    seen = set()
     for i, c in enumerate(chunks, 1):
-        parts.append(
-            f"[{i}] (Source: {c['source']}, Locator: {c['locator']})\n{c['text']}"
+        source, locator = c["source"], c["locator"]
+        parts.append(f"[{i}] (Source: {source}, Locator: {locator})\n{c['text']}")
+        if (source, locator) not in seen:
+            seen.add((source, locator))
+            citations.append({"source": source, "locator": locator, "snippet": make_snippet(c["text"])})
+    return "\n\n".join(parts), citations
+
+
+NO_RESULTS_ANSWER = (
+    "I couldn't find relevant information in the uploaded documents. "
+    "Please upload documents first or try a different question."
+)
+
+
+def _no_llm_answer(chunks: list[dict]) -> str:
+    """Answer used when no LLM client is configured."""
+    return (
+        "No LLM configured. Set USE_OLLAMA=1 for local Ollama, or OPENAI_API_KEY for OpenAI. "
+        f"Top result: {chunks[0]['text'][:100]}..."
+    )
+
+
+def _error_answer(error: Exception, chunks: list[dict]) -> str:
+    """Answer used when the LLM call fails."""
+    err_msg = str(error)
+    if "429" in err_msg or "quota" in err_msg.lower() or "insufficient_quota" in err_msg:
+        return (
+            "Relevant passages retrieved (LLM unavailable - quota exceeded). "
+            "Please check https://platform.openai.com/account/billing. "
+            f"Top result: {chunks[0]['text'][:150]}..."
         )
-    return "\n\n".join(parts)
+    return f"OpenAI API error: {err_msg}"
 
 
 def answer_with_citations(
@@ -44,42 +78,15 @@ def answer_with_citations(
     chunks = retrieve(question, top_k=top_k)
 
     if not chunks:
-        return (
-            "I couldn't find relevant information in the uploaded documents. "
-            "Please upload documents first or try a different question.",
-            [],
-        )
+        return (NO_RESULTS_ANSWER, [])
 
-    context = _format_context(chunks)
+    # Citations are used on success and on API failure fallback
+    context, citations = _build_context(chunks)
     prompt = CITATION_PROMPT.format(context=context, question=question)
 
     client = get_client(api_key=api_key)
     if client is None:
-        citations = []
-        seen = set()
-        for c in chunks:
-            key = (c["source"], c["locator"])
-            if key not in seen:
-                seen.add(key)
-                citations.append({"source": c["source"], "locator": c["locator"], "snippet": c["snippet"]})
-        return (
-            "No LLM configured. Set USE_OLLAMA=1 for local Ollama, or OPENAI_API_KEY for OpenAI. "
-            f"Top result: {chunks[0]['snippet'][:100]}...",
-            citations,
-        )
-
-    # Build citations from chunks (used on success and on API failure fallback)
-    citations = []
-    seen = set()
-    for c in chunks:
-        key = (c["source"], c["locator"])
-        if key not in seen:
-            seen.add(key)
-            citations.append({
-                "source": c["source"],
-                "locator": c["locator"],
-                "snippet": c["snippet"],
-            })
+        return (_no_llm_answer(chunks), citations)
 
     try:
         response = client.chat.completions.create(
@@ -89,15 +96,43 @@ def answer_with_citations(
         )
         answer = response.choices[0].message.content or ""
     except Exception as e:
-        err_msg = str(e)
-        if "429" in err_msg or "quota" in err_msg.lower() or "insufficient_quota" in err_msg:
-            fallback = (
-                "Relevant passages retrieved (LLM unavailable - quota exceeded). "
-                "Please check https://platform.openai.com/account/billing. "
-                f"Top result: {chunks[0]['snippet'][:150]}..."
+        return (_error_answer(e, chunks), citations)
+
+    return answer.strip(), citations
+
+
+async def answer_with_citations_async(
+    question: str,
+    top_k: int = 5,
+    api_key: str | None = None,
+) -> tuple[str, list[dict]]:
+    """
+    Async variant of answer_with_citations(). Retrieval runs in a worker thread
+    and the LLM call uses AsyncOpenAI, so other requests (e.g. memory
+    extraction) can run concurrently.
+    """
+    chunks = await asyncio.to_thread(retrieve, question, top_k=top_k)
+
+    if not chunks:
+        return (NO_RESULTS_ANSWER, [])
+
+    context, citations = _build_context(chunks)
+    prompt = CITATION_PROMPT.format(context=context, question=question)
+
+    client = get_async_client(api_key=api_key)
+    if client is None:
+        return (_no_llm_answer(chunks), citations)
+
+    async with client:
+        try:
+            response = await client.chat.completions.create(
+                model=get_model(),
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0,
             )
-            return (fallback, citations)
-        return (f"OpenAI API error: {err_msg}", citations)
+            answer = response.choices[0].message.content or ""
+        except Exception as e:
+            return (_error_answer(e, chunks), citations)
 
     return answer.strip(), citations
 
@@ -1,11 +1,44 @@
 """Retrieval: query ChromaDB and return relevant chunks with metadata."""
 
+from functools import lru_cache
 from pathlib import Path
 
-import chromadb
-from chromadb.config import Settings
+import numpy as np
 
-from src.indexing import DEFAULT_CHROMA_PATH, DEFAULT_COLLECTION_NAME, get_embedding_model
+from src.indexing import (
+    DEFAULT_CHROMA_PATH,
+    DEFAULT_COLLECTION_NAME,
+    _get_collection,
+    _is_missing_collection,
+    _with_collection,
+    get_embedding_model,
+)
+
+
+SNIPPET_CHARS = 200
+_ELLIPSIS = "..."
+
+
+def make_snippet(text: str) -> str:
+    """Citation snippet: first ~200 chars of a chunk's text."""
+    if len(text) <= SNIPPET_CHARS:
+        return text
+    return text[:SNIPPET_CHARS] + _ELLIPSIS
+
+
+@lru_cache(maxsize=1024)
+def _embed_query(query: str) -> np.ndarray:
+    """
+    Return the L2-normalized embedding for a query, cached per query (there is
+    one process-wide model) so repeated questions skip the encoder. Cast to
+    float32 like indexed embeddings (the CUDA path encodes in fp16); read-only
+    since it is shared.
+    """
+    embedding = get_embedding_model().encode(
+        [query], normalize_embeddings=True, show_progress_bar=False
+    )[0].astype(np.float32, copy=False)
+    embedding.setflags(write=False)
+    return embedding
 
 
 def retrieve(
@@ -16,25 +49,31 @@ def retrieve(
 ) -> list[dict]:
     """
     Retrieve top-k chunks for a query. Returns list of dicts with:
-    - text, source, locator, snippet (first ~200 chars of text)
+    - text, source, locator (build citation snippets with make_snippet(text))
     """
     try:
-        client = chromadb.PersistentClient(
-            path=str(persist_directory),
-            settings=Settings(anonymized_telemetry=False),
-        )
-        collection = client.get_collection(collection_name)
+        _get_collection(persist_directory, collection_name, create=False)
     except Exception:
         return []
 
-    model = get_embedding_model()
-    query_embedding = model.encode([query], show_progress_bar=False).tolist()
-
-    results = collection.query(
-        query_embeddings=query_embedding,
-        n_results=min(top_k, 10),
-        include=["documents", "metadatas"],
-    )
+    query_embeddings = _embed_query(query)[np.newaxis]
+    try:
+        # Reopens the collection once if another process deleted and recreated it
+        results = _with_collection(
+            persist_directory,
+            collection_name,
+            lambda c: c.query(
+                query_embeddings=query_embeddings,
+                n_results=min(top_k, 10),
+                include=["documents", "metadatas"],
+            ),
+            create=False,
+        )
+    except Exception as e:
+        # Deleted elsewhere and not recreated: nothing indexed
+        if _is_missing_collection(e):
+            return []
+        raise
 
     if not results["documents"] or not results["documents"][0]:
         return []
@@ -45,15 +84,10 @@ def retrieve(
 
     for i, doc in enumerate(docs):
         meta = metadatas[i] if i < len(metadatas) else {}
-        source = meta.get("source", "unknown")
-        locator = meta.get("locator", "unknown")
-        snippet = (doc[:200] + "..." if len(doc) > 200 else doc) if doc else ""
-
         chunks.append({
-            "text": doc,
-            "source": source,
-            "locator": locator,
-            "snippet": snippet,
+            "text": doc or "",
+            "source": meta.get("source", "unknown"),
+            "locator": meta.get("locator", "unknown"),
         })
 
     return chunks